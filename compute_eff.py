@@ -1,7 +1,10 @@
 import ROOT
 import os
 import re
+import json
+import hashlib
 import argparse
+from run_store import add_certification_args, run_filter
 
 filters = [
     'hltEG32L1SingleEGOrEtFilter',
@@ -18,24 +21,34 @@ filters = [
     'hltEle32WPTightGsfTrackIsoFilter'
 ]
 
+firstbin = 21 #81 GeV
+lastbin = 41  #101 GeV
+# Sidebands used for the fake estimation: bins 0-5 (60-65 GeV) and 55-60 (115-120 GeV)
+fakebins = [(0, 5), (55, 60)]
+subtract_fakes = True
+
 parser = argparse.ArgumentParser()
 parser.add_argument('--year', choices=['2024', '2025', '2024_25'], default='2025', help='Which year to run over')
 parser.add_argument('--quiet', '-q', action='store_true', help='Suppress printout messages')
+parser.add_argument('--from-index', action='store_true', help='Rebuild the counts from the run metadata index only, without opening any DQM file')
+add_certification_args(parser)
 args = parser.parse_args()
 
 base_dir = '/eos/cms/store/group/tsg/STEAM/savarghe/HLTpbFiles'
 folder_path = os.path.join(base_dir, args.year)
 
+# Per-run metadata index: file, size, mtime, L1 EB count, read status, counts and their fingerprint.
+# It is only valid for the count definition it was made with, so that is hashed into it too.
+meta_path = f"run_meta_{args.year}.json"
+
 def extract_run_number(filename):
     match = re.search(r'R0*([0-9]{6})', filename)
     return int(match.group(1)) if match else None
 
-def get_counts(filename, forfakes=True):
+def get_counts(filename, forfakes=subtract_fakes):
     f = ROOT.TFile.Open(filename)
     prefix = filename[-11:-5]
     folder = f"DQMData/Run {prefix}/HLT/Run summary/EGM/TrigObjTnP/"
-    firstbin = 21 #81 GeV
-    lastbin = 41  #101 GeV
     EB, EBplus, EBminus = [], [], []
     EE, EEplus, EEminus = [], [], []
 
@@ -52,12 +65,12 @@ def get_counts(filename, forfakes=True):
         val_EEminus = int(h.Integral(1, 1, firstbin, lastbin))
         val_EE = val_EEplus + val_EEminus
         if forfakes:
-            # Fake estimation: sum of bins 0-5 (60-65 GeV) and 55-60 (115-120 GeV)
-            fake_EB = h.Integral(2, 3, 0, 5) + h.Integral(2, 3, 55, 60)
-            fake_EBplus = h.Integral(3, 3, 0, 5) + h.Integral(3, 3, 55, 60)
-            fake_EBminus = h.Integral(2, 2, 0, 5) + h.Integral(2, 2, 55, 60)
-            fake_EEplus = h.Integral(4, 4, 0, 5) + h.Integral(4, 4, 55, 60)
-            fake_EEminus = h.Integral(1, 1, 0, 5) + h.Integral(1, 1, 55, 60)
+            # Fake estimation: sum of the sideband bins
+            fake_EB = sum(h.Integral(2, 3, lo, hi) for lo, hi in fakebins)
+            fake_EBplus = sum(h.Integral(3, 3, lo, hi) for lo, hi in fakebins)
+            fake_EBminus = sum(h.Integral(2, 2, lo, hi) for lo, hi in fakebins)
+            fake_EEplus = sum(h.Integral(4, 4, lo, hi) for lo, hi in fakebins)
+            fake_EEminus = sum(h.Integral(1, 1, lo, hi) for lo, hi in fakebins)
             fake_EE = fake_EEplus + fake_EEminus
 
             # Subtract fakes and ensure non-negative counts
@@ -77,33 +90,99 @@ def get_counts(filename, forfakes=True):
         
     return EB, EBplus, EBminus, EE, EEplus, EEminus
 
-# Step 1: Read and store data for valid runs
+def fingerprint(obj):
+    return hashlib.sha1(json.dumps(obj).encode()).hexdigest()[:16]
+
+# Everything that decides what the stored counts mean
+definition = fingerprint({"filters": filters, "window": [firstbin, lastbin],
+                          "fakebins": fakebins, "subtract_fakes": subtract_fakes})
+
+def load_meta():
+    # Per-run entries, or nothing if the index was made with another count definition
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get("definition") != definition:
+        if not args.quiet:
+            print(f"{meta_path} was made with different filters/mass window, ignoring it")
+        return {}
+    return meta["runs"]
+
+def save_meta(runs):
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"definition": definition, "runs": runs}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, meta_path)
+
+def counts_intact(entry):
+    # The stored counts still match the fingerprint taken when they were read
+    return entry["status"] == "ok" and fingerprint(entry["counts"]) == entry["fingerprint"]
+
+# Step 1: Update the run metadata index, reading only new or modified files
+meta = load_meta()
+if args.from_index and not meta:
+    print(f"No usable run metadata index in {meta_path}, run without --from-index first")
+    exit(1)
+if not args.from_index:
+    old_meta, meta = meta, {}
+    for fname in sorted(os.listdir(folder_path)):
+        if not (fname.endswith(".root") and fname.startswith("DQM")):
+            continue
+        full_path = os.path.join(folder_path, fname)
+        if not args.quiet:
+            print(f"Found file: {fname}")
+        run = extract_run_number(fname)
+        if run is None:
+            if not args.quiet:
+                print(f"Skipping {fname} (no run number found)")
+            continue
+        st = os.stat(full_path)
+        entry = old_meta.get(str(run))
+        # Unchanged files that were read fine before are not opened again
+        if (entry and counts_intact(entry) and entry["file"] == fname
+                and entry["size"] == st.st_size and entry["mtime"] == int(st.st_mtime)):
+            meta[str(run)] = entry
+            continue
+        old_fingerprint = entry.get("fingerprint") if entry else None
+        entry = {"file": fname, "size": st.st_size, "mtime": int(st.st_mtime)}
+        try:
+            counts = list(get_counts(full_path))
+            entry.update(status="ok", eb_l1=counts[0][0], counts=counts, fingerprint=fingerprint(counts))
+            if old_fingerprint and old_fingerprint != entry["fingerprint"] and not args.quiet:
+                print(f"Counts changed for run {run} ({fname} was modified)")
+        except Exception as e:
+            if not args.quiet:
+                print(f"Skipping {fname} due to error: {e}")
+            entry.update(status="error", error=str(e))
+        meta[str(run)] = entry
+    save_meta(meta)
+
+# Step 2: Select valid runs from the index
+keep = run_filter(args)
 valid_runs = []
 all_counts = []
 
-for fname in sorted(os.listdir(folder_path)):
-    if not (fname.endswith(".root") and fname.startswith("DQM")):
+for key in sorted(meta, key=int):
+    run = int(key)
+    entry = meta[key]
+    if entry["status"] != "ok":
         continue
-    full_path = os.path.join(folder_path, fname)
-    if not args.quiet:
-        print(f"Found file: {fname}")
-    run = extract_run_number(fname)
-    if run is None:
+    if not counts_intact(entry):
         if not args.quiet:
-            print(f"Skipping {fname} (no run number found)")
+            print(f"Skipping run {run} (stored counts do not match their fingerprint)")
         continue
-    try:
-        EB, EBplus, EBminus, EE, EEplus, EEminus = get_counts(full_path)
-        if EB[0] > 20000:
-            valid_runs.append(run)
-            all_counts.append((run, EB, EBplus, EBminus, EE, EEplus, EEminus))
-        else:
-            if not args.quiet:
-                print(f"Skipping run {run} (first filter EB count = {EB[0]})")
-    except Exception as e:
+    if keep and not keep(run):
         if not args.quiet:
-            print(f"Skipping {fname} due to error: {e}")
+            print(f"Skipping run {run} (not certified or excluded)")
         continue
+    EB, EBplus, EBminus, EE, EEplus, EEminus = entry["counts"]
+    if EB[0] > 20000:
+        valid_runs.append(run)
+        all_counts.append((run, EB, EBplus, EBminus, EE, EEplus, EEminus))
+    else:
+        if not args.quiet:
+            print(f"Skipping run {run} (first filter EB count = {EB[0]})")
 
 if not valid_runs:
     print(f"No valid runs found passing EB > 30000 in {folder_path}")
@@ -113,13 +192,13 @@ min_run = (min(valid_runs) // 1000) * 1000
 max_run = ((max(valid_runs) // 1000) + 1) * 1000
 nbins = max_run - min_run
 
-# Step 2: Initialize histograms
+# Step 3: Initialize histograms
 histos = {region: [] for region in ["EB", "EBplus", "EBminus", "EE", "EEplus", "EEminus"]}
 for region in histos:
     for filt in filters:
         histos[region].append(ROOT.TH1F(f"histos{region}_countsvsrun_{filt}", '', nbins, min_run, max_run))
 
-# Step 3: Fill histograms
+# Step 4: Fill histograms
 for run, EB, EBplus, EBminus, EE, EEplus, EEminus in all_counts:
     for i, h in enumerate(histos["EB"]):        h.Fill(run, EB[i]);        h.SetBinError(h.FindBin(run), EB[i]**0.5)
     for i, h in enumerate(histos["EBplus"]):    h.Fill(run, EBplus[i]);    h.SetBinError(h.FindBin(run), EBplus[i]**0.5)
@@ -128,7 +207,7 @@ for run, EB, EBplus, EBminus, EE, EEplus, EEminus in all_counts:
     for i, h in enumerate(histos["EEplus"]):    h.Fill(run, EEplus[i]);    h.SetBinError(h.FindBin(run), EEplus[i]**0.5)
     for i, h in enumerate(histos["EEminus"]):   h.Fill(run, EEminus[i]);   h.SetBinError(h.FindBin(run), EEminus[i]**0.5)
 
-# Step 4: Write output
+# Step 5: Write output
 outname = f"out_barrelendcaps_{args.year}.root"
 out = ROOT.TFile(outname, "RECREATE")
 for hlist in histos.values():
@@ -1,6 +1,7 @@
 import ROOT
 import os
 import argparse
+from run_store import RunStore, add_view_args, plot_views, add_certification_args, run_filter
 
 ROOT.gROOT.SetBatch(True)
 ROOT.gStyle.SetOptStat(0)
@@ -10,6 +11,8 @@ ROOT.gErrorIgnoreLevel = ROOT.kError
 parser = argparse.ArgumentParser()
 parser.add_argument('--year', choices=['2024', '2025', '2024_25'], default='2025', help='Which year to process')
 parser.add_argument('--quiet', '-q', action='store_true', help='Suppress printout messages')
+add_view_args(parser)
+add_certification_args(parser)
 args = parser.parse_args()
 
 filters = [
@@ -40,16 +43,6 @@ def short_label(name):
     name = name.replace("Filter", "")
     return name
 
-def load_histograms(file, region):
-    histos = {}
-    for filt in filters:
-        hname = f"histos{region}_countsvsrun_{filt}"
-        h = file.Get(hname)
-        if h:
-            histos[filt] = h.Clone(f"{region}_{filt}")
-            h.SetDirectory(0)
-    return histos
-
 def compute_efficiencies(histos, region_label):
     effs = []
 
@@ -101,7 +94,7 @@ def compute_efficiencies(histos, region_label):
 
     return effs
 
-def draw_overlay(effs, title, outname, outdir):
+def draw_overlay(effs, title, outname, outdir, latest_run=None):
     c = ROOT.TCanvas("c", "", 1000, 700)
     c.SetRightMargin(0.2)
 
@@ -114,7 +107,7 @@ def draw_overlay(effs, title, outname, outdir):
     # Auto y-axis range
     y_min = 1.0
     y_max = 0.0
-    latest_run = 0
+    last_x = 0
     for _, g in effs:
         for i in range(g.GetN()):
             x = g.GetX()[i]
@@ -124,8 +117,10 @@ def draw_overlay(effs, title, outname, outdir):
                 y_min = y
             if y + yerr > y_max:
                 y_max = y + yerr
-            if x > latest_run:
-                latest_run = int(x)
+            if x > last_x:
+                last_x = int(x)
+    if latest_run is None:
+        latest_run = last_x
     # Draw each graph
     for i, (label, g) in enumerate(effs):
         g.GetXaxis().SetTitle("Run")
@@ -175,8 +170,17 @@ if __name__ == "__main__":
     outdir = f"/eos/user/s/savarghe/www/EGMDQM/{year}/plots_filter_eff"
 
     f = ROOT.TFile(infile)
+    store = RunStore.from_file(f, filters)
+    keep = run_filter(args)
+    if keep:
+        # Certification/exclusion only filters the loaded runs, no DQM file is touched
+        store = store.filtered(keep)
+        if not store.runs:
+            print(f"No runs left in {infile} after certification/exclusion")
+            exit(1)
+    views = plot_views(store, args)
     for region in ["EB", "EE", "EBplus", "EBminus", "EEplus", "EEminus"]:
-        hists = load_histograms(f, region)
+        hists = store.run_histograms(region, 0, len(store.runs), "full")
         effs = compute_efficiencies(hists, region)
         draw_overlay(
             effs,
@@ -184,4 +188,15 @@ if __name__ == "__main__":
             f"step_efficiency_{region}.png",
             outdir
         )
+        # Extra views (recent runs, run ranges, run groups) from the already loaded store
+        for suffix, tag, make_histos, latest_run in views:
+            view_hists = make_histos(region)
+            effs = compute_efficiencies(view_hists, f"{region}_{suffix}")
+            draw_overlay(
+                effs,
+                f"{region}: Filter Efficiency vs Run ({tag})",
+                f"step_efficiency_{region}.png",
+                f"{outdir}_{suffix}",
+                latest_run=latest_run
+            )
     f.Close()
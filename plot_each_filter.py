@@ -1,6 +1,7 @@
 import ROOT
 import os
 import argparse
+from run_store import RunStore, add_view_args, plot_views, add_certification_args, run_filter
 
 ROOT.gROOT.SetBatch(True)
 ROOT.gStyle.SetOptStat(0)
@@ -10,6 +11,8 @@ ROOT.gErrorIgnoreLevel = ROOT.kError
 parser = argparse.ArgumentParser()
 parser.add_argument('--year', choices=['2024', '2025', '2024_25'], default='2025', help='Which year to process')
 parser.add_argument('--quiet', '-q', action='store_true', help='Suppress printout messages')
+add_view_args(parser)
+add_certification_args(parser)
 args = parser.parse_args()
 
 filters = [
@@ -39,15 +42,6 @@ def short_label(name):
                 .replace("Gsf", "")
                 .replace("Filter", ""))
 
-def load_histograms(file, region):
-    histos = {}
-    for filt in filters:
-        hname = f"histos{region}_countsvsrun_{filt}"
-        h = file.Get(hname)
-        if h:
-            histos[filt] = h.Clone(f"{region}_{filt}")
-    return histos
-
 def compute_single_efficiency(histos, i, region_label):
     num = histos.get(filters[i])
     denom = histos.get(filters[i - 1])
@@ -91,7 +85,7 @@ def compute_single_efficiency(histos, i, region_label):
 
     return g, label, delta
 
-def draw_single(graph, label, region, i):
+def draw_single(graph, label, region, i, outdir, title=None, latest_run=None):
     if not graph:
         return
 
@@ -116,7 +110,7 @@ def draw_single(graph, label, region, i):
 
     graph.SetMinimum(y_min * 0.95)
     graph.SetMaximum(y_max * 1.02)
-    graph.SetTitle(f"{region}: {label} Filter Efficiency vs Run") 
+    graph.SetTitle(title or f"{region}: {label} Filter Efficiency vs Run")
     graph.GetXaxis().SetTitle("Run")
     graph.GetYaxis().SetTitle("Step Efficiency")
     graph.GetXaxis().SetTitleOffset(1.2)
@@ -124,8 +118,8 @@ def draw_single(graph, label, region, i):
 
     graph.Draw("AP")
     # Get latest run
-    latest_run = int(max([graph.GetX()[j] for j in range(graph.GetN())]))
-    
+    if latest_run is None:
+        latest_run = int(max([graph.GetX()[j] for j in range(graph.GetN())]))
 
     latex = ROOT.TLatex()
     latex.SetNDC()
@@ -141,7 +135,6 @@ def draw_single(graph, label, region, i):
     leg.AddEntry(graph, label, "p")
     leg.Draw()
 
-    outdir = f"/eos/user/s/savarghe/www/EGMDQM/{args.year}/plots_step_eff_single"
     os.makedirs(outdir, exist_ok=True)
     cname = f"{outdir}/{region}_{short_label(filters[i])}.png"
     c.SaveAs(cname)
@@ -157,12 +150,30 @@ def draw_single(graph, label, region, i):
 if __name__ == "__main__":
     year = args.year
     infile = f"out_barrelendcaps_{year}.root"
+    outdir = f"/eos/user/s/savarghe/www/EGMDQM/{year}/plots_step_eff_single"
     f = ROOT.TFile.Open(infile)
+    store = RunStore.from_file(f, filters)
+    keep = run_filter(args)
+    if keep:
+        # Certification/exclusion only filters the loaded runs, no DQM file is touched
+        store = store.filtered(keep)
+        if not store.runs:
+            print(f"No runs left in {infile} after certification/exclusion")
+            exit(1)
+    views = plot_views(store, args)
 
     for region in ["EB", "EE", "EBplus", "EBminus", "EEplus", "EEminus"]:
-        histos = load_histograms(f, region)
+        histos = store.run_histograms(region, 0, len(store.runs), "full")
         for i in range(1, len(filters)):
             graph, label, delta = compute_single_efficiency(histos, i, region)
-            draw_single(graph, label, region, i)
+            draw_single(graph, label, region, i, outdir)
+        # Extra views (recent runs, run ranges, run groups) from the already loaded store
+        for suffix, tag, make_histos, latest_run in views:
+            view_histos = make_histos(region)
+            for i in range(1, len(filters)):
+                graph, label, delta = compute_single_efficiency(view_histos, i, f"{region}_{suffix}")
+                draw_single(graph, label, region, i, f"{outdir}_{suffix}",
+                            title=f"{region}: {label} Filter Efficiency vs Run ({tag})",
+                            latest_run=latest_run)
 
     f.Close()
@@ -9,13 +9,13 @@ echo "[`date`] Environment ready, starting Python"
 # Run scripts
 python3 unpack.py
 python3 compute_eff.py 
-python3 plot_all.py
-python3 plot_each_filter.py
+python3 plot_all.py --group-runs 10 --last 50
+python3 plot_each_filter.py --group-runs 10 --last 50
 #Run for 2024_25
 python3 copy_newfiles.py
 python3 compute_eff.py --year 2024_25 --quiet
-python3 plot_all.py --year 2024_25 --quiet
-python3 plot_each_filter.py --year 2024_25 --quiet
+python3 plot_all.py --year 2024_25 --quiet --group-runs 10 --last 50
+python3 plot_each_filter.py --year 2024_25 --quiet --group-runs 10 --last 50
 #update website
 python3 website/generate_html_index.py
 echo "[`date`] Finished compute_eff and plots updated"
@@ -0,0 +1,16 @@
+import argparse
+
+def parse_run_range(spec):
+    # "392000-393500" -> (392000, 393500), "392000-" -> (392000, None), "-393500" -> (None, 393500);
+    # used as an argparse type, so bad input ends in a parser error. Kept free of ROOT so unpack.py can use it.
+    first_run, sep, last_run = spec.partition('-')
+    try:
+        if not sep or not (first_run or last_run):
+            raise ValueError
+        first_run = int(first_run) if first_run else None
+        last_run = int(last_run) if last_run else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid run range '{spec}', expected A-B, A- or -B")
+    if first_run is not None and last_run is not None and first_run > last_run:
+        raise argparse.ArgumentTypeError(f"invalid run range '{spec}', first run is after last run")
+    return first_run, last_run
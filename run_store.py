@@ -0,0 +1,219 @@
+import ROOT
+import argparse
+import bisect
+import csv
+import datetime
+import json
+import os
+from array import array
+from itertools import accumulate
+from run_range import parse_run_range
+
+REGIONS = ["EB", "EE", "EBplus", "EBminus", "EEplus", "EEminus"]
+
+# Per-run filter counts read once from out_barrelendcaps_<year>.root, kept sorted by run.
+# Each count array has a cumulative twin, so the sum over any run slice is
+# cumulative[hi] - cumulative[lo] and a grouping costs O(groups), not O(runs).
+class RunStore:
+    def __init__(self, filters, runs, counts):
+        self.filters = filters
+        self.runs = runs
+        self.counts = counts  # counts[region][filter] -> list aligned with self.runs
+        self.cumulative = {
+            region: {filt: [0] + list(accumulate(vals)) for filt, vals in per_filter.items()}
+            for region, per_filter in counts.items()
+        }
+
+    @classmethod
+    def from_file(cls, file, filters):
+        # Runs are the filled bins of the EB L1 histogram (compute_eff.py fills one bin per valid run)
+        ref = file.Get(f"histosEB_countsvsrun_{filters[0]}")
+        bins = [b for b in range(1, ref.GetNbinsX() + 1) if ref.GetBinContent(b) > 0]
+        runs = [int(round(ref.GetBinLowEdge(b))) for b in bins]
+        counts = {}
+        for region in REGIONS:
+            counts[region] = {}
+            for filt in filters:
+                h = file.Get(f"histos{region}_countsvsrun_{filt}")
+                if h:
+                    counts[region][filt] = [h.GetBinContent(b) for b in bins]
+        return cls(filters, runs, counts)
+
+    def filtered(self, keep):
+        # New store restricted to the runs passing keep(run); cumulative sums are rebuilt once
+        idx = [i for i, run in enumerate(self.runs) if keep(run)]
+        counts = {region: {filt: [vals[i] for i in idx] for filt, vals in per_filter.items()}
+                  for region, per_filter in self.counts.items()}
+        return RunStore(self.filters, [self.runs[i] for i in idx], counts)
+
+    def run_slice(self, first_run=None, last_run=None):
+        # Index range [lo, hi) of the stored runs within [first_run, last_run], by binary search
+        lo = 0 if first_run is None else bisect.bisect_left(self.runs, first_run)
+        hi = len(self.runs) if last_run is None else bisect.bisect_right(self.runs, last_run)
+        return lo, hi
+
+    def total(self, region, filt, lo, hi):
+        cum = self.cumulative[region][filt]
+        return cum[hi] - cum[lo]
+
+    def run_histograms(self, region, lo, hi, name):
+        # Per-run histograms of the runs [lo, hi), binned one bin per run like compute_eff.py
+        first_run = self.runs[lo]
+        last_run = self.runs[hi - 1]
+        histos = {}
+        for filt, vals in self.counts[region].items():
+            h = ROOT.TH1F(f"{name}_{region}_{filt}", '', last_run + 1 - first_run, first_run, last_run + 1)
+            h.SetDirectory(0)
+            for idx in range(lo, hi):
+                b = self.runs[idx] - first_run + 1
+                h.SetBinContent(b, vals[idx])
+                h.SetBinError(b, vals[idx]**0.5)
+            histos[filt] = h
+        return histos
+
+    def group_histograms(self, region, groups, name):
+        # One variable-width bin per group spanning its runs, so the plotting code can
+        # BayesDivide them exactly like the per-run histograms
+        edges = [self.runs[lo] for lo, _ in groups] + [self.runs[groups[-1][1] - 1] + 1]
+        histos = {}
+        for filt in self.counts[region]:
+            h = ROOT.TH1F(f"{name}_{region}_{filt}", '', len(groups), array('d', edges))
+            h.SetDirectory(0)
+            for i, (lo, hi) in enumerate(groups):
+                val = self.total(region, filt, lo, hi)
+                h.SetBinContent(i + 1, val)
+                h.SetBinError(i + 1, val**0.5)
+            histos[filt] = h
+        return histos
+
+# Groupings are lists of (lo, hi) index ranges into the sorted run list
+
+def group_consecutive(runs, n):
+    return [(lo, min(lo + n, len(runs))) for lo in range(0, len(runs), n)]
+
+def boundary_ranges(runs, boundaries):
+    # (lo, hi) of every period starting at the sorted boundaries, empty periods included
+    edges = [bisect.bisect_left(runs, b) for b in boundaries] + [len(runs)]
+    return list(zip(edges, edges[1:]))
+
+def group_by_boundaries(runs, boundaries):
+    # boundaries are the first runs of each period; runs before the first boundary are in no group
+    return [(lo, hi) for lo, hi in boundary_ranges(runs, sorted(boundaries)) if hi > lo]
+
+def load_run_dates(path):
+    # Local table with one "run,YYYY-MM-DD[...]" line per run, '#' for comments
+    dates = {}
+    with open(path) as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#'):
+                continue
+            dates[int(row[0])] = datetime.date.fromisoformat(row[1].strip()[:10])
+    return dates
+
+def week_boundaries(runs, run_dates):
+    # First run of every ISO week. Runs missing from the table stay in the week of the last dated
+    # run before them; runs before the first dated run belong to no week
+    boundaries = []
+    current = None
+    for run in runs:
+        date = run_dates.get(run)
+        if date is None:
+            continue
+        week = date.isocalendar()[:2]
+        if week != current:
+            boundaries.append(run)
+            current = week
+    return boundaries
+
+def parse_eras(spec):
+    # "2025C:392000,2025D:394000" -> [("2025C", 392000), ("2025D", 394000)]; used as an argparse type
+    eras = []
+    for item in spec.split(','):
+        name, sep, first_run = item.partition(':')
+        try:
+            if not sep or not name.strip():
+                raise ValueError
+            eras.append((name.strip(), int(first_run)))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid era '{item}', expected NAME:RUN")
+    return sorted(eras, key=lambda e: e[1])
+
+def positive_int(value):
+    # argparse type for run counts, which must be at least 1
+    try:
+        n = int(value)
+    except ValueError:
+        n = 0
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive number of runs, got '{value}'")
+    return n
+
+def load_certified_runs(path):
+    # Standard certification JSON, {"392000": [[1, 120], [125, 300]], ...}. The counts are per run,
+    # so filtering is per run too: a run with at least one good lumi range is kept whole
+    with open(path) as f:
+        return {int(run) for run, ranges in json.load(f).items() if ranges}
+
+def parse_run_list(spec):
+    # Comma-separated runs, or a file with runs separated by commas/whitespace ('#' for comments)
+    if os.path.isfile(spec):
+        with open(spec) as f:
+            spec = " ".join(line.split('#')[0] for line in f)
+    return {int(run) for run in spec.replace(',', ' ').split()}
+
+def add_certification_args(parser):
+    parser.add_argument('--golden-json', metavar='JSON', help='Keep only runs with at least one certified lumi range in this local run/lumi-range JSON (whole runs are kept)')
+    parser.add_argument('--exclude-runs', metavar='RUNS', help='Comma-separated runs (or a file listing them) to drop')
+
+def run_filter(args):
+    # Predicate selecting the runs allowed by --golden-json/--exclude-runs, or None if neither is given
+    if not args.golden_json and not args.exclude_runs:
+        return None
+    certified = load_certified_runs(args.golden_json) if args.golden_json else None
+    excluded = parse_run_list(args.exclude_runs) if args.exclude_runs else set()
+    return lambda run: (certified is None or run in certified) and run not in excluded
+
+def add_view_args(parser):
+    parser.add_argument('--group-runs', type=positive_int, metavar='N', help='Also plot efficiencies aggregated over N consecutive runs')
+    parser.add_argument('--run-dates', metavar='CSV', help='Also plot weekly efficiencies using a local run,date table')
+    parser.add_argument('--eras', type=parse_eras, metavar='NAME:RUN,...', help='Also plot per-era efficiencies, given the first run of each era')
+    parser.add_argument('--run-range', type=parse_run_range, metavar='A-B', help='Also plot the runs A to B (inclusive, either end may be left open)')
+    parser.add_argument('--last', type=positive_int, metavar='N', help='Also plot the latest N runs ("recent" plots)')
+
+def plot_views(store, args):
+    # (suffix, title tag, region -> histograms, latest run) for every extra plot family
+    # requested on the command line, all served from the same loaded store
+    views = []
+
+    def add_range(suffix, tag, lo, hi):
+        if hi > lo:
+            views.append((suffix, tag, lambda region: store.run_histograms(region, lo, hi, suffix), store.runs[hi - 1]))
+
+    def add_groups(suffix, tag, groups, period=None):
+        # Runs before the first period are not drawn; say so rather than drop them silently
+        left_out = groups[0][0] if groups else len(store.runs)
+        if period and left_out and not args.quiet:
+            print(f"{left_out} runs before the first {period} are left out of the {suffix} plots")
+        if groups:
+            views.append((suffix, tag, lambda region: store.group_histograms(region, groups, suffix), store.runs[groups[-1][1] - 1]))
+
+    if args.last:
+        add_range("recent", f"last {args.last} runs", max(0, len(store.runs) - args.last), len(store.runs))
+    if args.run_range:
+        first_run, last_run = args.run_range
+        lo, hi = store.run_slice(first_run, last_run)
+        if hi > lo:
+            # Open ends keep a fixed directory name; the title shows the runs actually drawn
+            suffix = f"runs{first_run or 'first'}-{last_run or 'latest'}"
+            add_range(suffix, f"runs {store.runs[lo]}-{store.runs[hi - 1]}", lo, hi)
+    if args.group_runs:
+        add_groups(f"{args.group_runs}runs", f"{args.group_runs} runs/point", group_consecutive(store.runs, args.group_runs))
+    if args.run_dates:
+        boundaries = week_boundaries(store.runs, load_run_dates(args.run_dates))
+        add_groups("weekly", "per week", group_by_boundaries(store.runs, boundaries), "dated run")
+    if args.eras:
+        ranges = boundary_ranges(store.runs, [first_run for _, first_run in args.eras])
+        # Name the eras that have runs in the title, in the same order as the points
+        names = [name for (name, _), (lo, hi) in zip(args.eras, ranges) if hi > lo]
+        add_groups("eras", f"eras {', '.join(names)}", [(lo, hi) for lo, hi in ranges if hi > lo], "era")
+    return views
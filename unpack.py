@@ -1,47 +1,141 @@
 import os
 import re
+import json
+import argparse
 import zipfile
+from run_range import parse_run_range
 from tqdm import tqdm  # optional progress bar
 
-# Directory containing the ZIP files
-zip_dir = "/eos/cms/store/group/comm_dqm/DQMGUI_Backup/data/offline/OnlineData/original/00039xxxx"
+parser = argparse.ArgumentParser()
+parser.add_argument('--runs', type=parse_run_range, default='392000-', help='Run range A-B to unpack (either end may be left open)')
+parser.add_argument('--output-dir', default='/eos/cms/store/group/tsg/STEAM/savarghe/HLTpbFiles/2025', help='Where to put the extracted ROOT files')
+parser.add_argument('--index', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run_index.json'),
+                    help='Run index of the backup area, shared by nightly runs and backfills')
+args = parser.parse_args()
+
+# Backup area holding one subdirectory per run range (00039xxxx, 00040xxxx, ...)
+backup_dir = "/eos/cms/store/group/comm_dqm/DQMGUI_Backup/data/offline/OnlineData/original"
 
 # Local output directory for extracted ROOT files
-output_dir = "/eos/cms/store/group/tsg/STEAM/savarghe/HLTpbFiles/2025"
+output_dir = args.output_dir
 os.makedirs(output_dir, exist_ok=True)
 
+# Persistent index of the HLTpb members of every archive, {archive: {"stamp": [size, mtime], "runs": {run: [member, size]}}},
+# so only new or changed archives are listed again. The run -> (archive, member, size) map is derived from it.
+# It describes the backup area, so it lives in one place whatever the output directory is.
+index_path = args.index
+
+MIN_SIZE_BYTES = 10 * 1024 * 1024  # 10 MB in bytes
+
 # Extract run number from filename
 def extract_run_from_name(fname):
     match = re.search(r"R(\d{6,})", fname)
     return int(match.group(1)) if match else None
 
-# Scan all ZIP files
-zip_files = sorted(f for f in os.listdir(zip_dir) if f.endswith(".zip"))
+def in_range(run, first_run, last_run):
+    return (first_run is None or run >= first_run) and (last_run is None or run <= last_run)
 
-# Get list of already extracted files
-already_present = set(os.listdir(output_dir))
+def overlaps(lo, hi, first_run, last_run):
+    return (first_run is None or hi >= first_run) and (last_run is None or lo <= last_run)
 
-MIN_SIZE_BYTES = 10 * 1024 * 1024  # 10 MB in bytes
+def load_index():
+    if not os.path.exists(index_path):
+        return {"archives": {}}
+    with open(index_path) as f:
+        index = json.load(f)
+    # Indexes written before the per-archive layout are rebuilt from scratch
+    if "runs" in index:
+        return {"archives": {}}
+    return index
+
+def save_index(index):
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+def index_archive(zip_path, stamp):
+    # HLTpb members of one archive; replaces whatever the index held for it before
+    runs = {}
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        for info in zf.infolist():
+            file = info.filename
+            if "DQM_V0001_HLTpb_R" not in file or not file.endswith(".root"):
+                continue
+            run = extract_run_from_name(file)
+            if not run:
+                continue
+            key = str(run)
+            if key not in runs or info.file_size > runs[key][1]:
+                runs[key] = [file, info.file_size]
+    return {"stamp": stamp, "runs": runs}
+
+def run_copies(index):
+    # run -> (archive, member, size), keeping the largest copy when several archives hold the run
+    best = {}
+    for archive, entry in index["archives"].items():
+        for key, (member, size) in entry["runs"].items():
+            if key not in best or size > best[key][2]:
+                best[key] = (archive, member, size)
+    return best
+
+first_run, last_run = args.runs
+index = load_index()
+
+# Step 1: Discover run-range subdirectories overlapping the requested runs
+range_dirs = []
+for d in sorted(os.listdir(backup_dir)):
+    match = re.fullmatch(r"(\d+)xxxx", d)
+    if not match:
+        continue
+    lo = int(match.group(1)) * 10000
+    if overlaps(lo, lo + 9999, first_run, last_run):
+        range_dirs.append(d)
+
+# Step 2: Index the archives that are new or changed since the last pass
+seen = set()
+for d in range_dirs:
+    for zipf in sorted(f for f in os.listdir(os.path.join(backup_dir, d)) if f.endswith(".zip")):
+        archive = os.path.join(d, zipf)
+        seen.add(archive)
+        zip_path = os.path.join(backup_dir, archive)
+        st = os.stat(zip_path)
+        stamp = [st.st_size, int(st.st_mtime)]
+        entry = index["archives"].get(archive)
+        if entry and entry["stamp"] == stamp:
+            continue
+        try:
+            index["archives"][archive] = index_archive(zip_path, stamp)
+        except Exception as e:
+            print(f"Failed to index {archive}: {e}")
+
+# Drop archives that have disappeared from disk
+for archive in list(index["archives"]):
+    d = os.path.dirname(archive)
+    if (d in range_dirs and archive not in seen) or not os.path.isdir(os.path.join(backup_dir, d)):
+        del index["archives"][archive]
+save_index(index)
+
+# Step 3: Pick the runs to extract and group them by archive
+already_present = set(os.listdir(output_dir))
+to_extract = {}
+for key, (archive, member, size) in run_copies(index).items():
+    run = int(key)
+    if not in_range(run, first_run, last_run):
+        continue
+    if size <= MIN_SIZE_BYTES or os.path.basename(member) in already_present:
+        continue
+    to_extract.setdefault(archive, []).append(member)
 
-for zipf in tqdm(zip_files, desc="Extracting HLTpb ROOTs >10MB"):
-    zip_path = os.path.join(zip_dir, zipf)
+# Step 4: Open only the archives holding those runs
+for archive in tqdm(sorted(to_extract), desc="Extracting HLTpb ROOTs >10MB"):
     try:
-        with zipfile.ZipFile(zip_path, 'r') as zf:
-            for info in zf.infolist():
-                file = info.filename
-                if (
-                    "DQM_V0001_HLTpb_R" in file and 
-                    file.endswith(".root") and 
-                    info.file_size > MIN_SIZE_BYTES
-                ):
-                    run = extract_run_from_name(file)
-                    if run and run >= 392000:
-                        flat_name = os.path.basename(file)
-                        if flat_name in already_present:
-                            continue  # Skip if already extracted
-                        temp_path = zf.extract(file, path=output_dir)
-                        final_path = os.path.join(output_dir, flat_name)
-                        os.rename(temp_path, final_path)
-                        already_present.add(flat_name)
+        with zipfile.ZipFile(os.path.join(backup_dir, archive), 'r') as zf:
+            for member in to_extract[archive]:
+                flat_name = os.path.basename(member)
+                temp_path = zf.extract(member, path=output_dir)
+                final_path = os.path.join(output_dir, flat_name)
+                os.rename(temp_path, final_path)
+                already_present.add(flat_name)
     except Exception as e:
-        print(f"Failed to extract from {zipf}: {e}")
+        print(f"Failed to extract from {archive}: {e}")